@@ -3,6 +3,8 @@ import boto3
 import logging
 import datetime
 import os
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 
 logger = logging.getLogger()
@@ -24,6 +26,19 @@ def _get_named_parameter(event, name):
     return next(item for item in event['parameters'] if item['name'] == name)['value']
 
 
+def _get_optional_parameter(event, name, default=None):
+    """
+    get the parameter 'name' from the lambda event object, or <default> if it was not provided
+    Args:
+        event: lambda event
+        name: name of the parameter to return
+        default: value to return if the parameter is missing
+    Returns:
+        parameter value
+    """
+    return next((item['value'] for item in event.get('parameters', []) if item['name'] == name), default)
+
+
 def _execute_sitewise_query(sw_client, query_statement, max_results=20):
     """
     Run a query using the IoT SiteWise SQL engine
@@ -114,7 +129,7 @@ def _get_property_id(sw_client, asset_id, property_name, maxResults=20):
     query_statement = f"SELECT asset_id, property_id, property_name FROM asset_property WHERE asset_id ='{
         asset_id}' AND property_name = '{property_name}'"
     data = _execute_sitewise_query(sw_client, query_statement, maxResults)
-    if data and 'property_id' in data:
+    if data and data.get('property_id'):
         return data['property_id'][0]
     else:
         raise ValueError(f"Property {property_name} for asset {
@@ -356,6 +371,226 @@ def get_latest_value(sw_client, asset_name, property_name, maxResults=1):
                          property_name}' on asset '{asset_name}'") from e
 
 
+def _get_interpolated_values(sw_client, asset_id, property_id, start_time_seconds, end_time_seconds, interval_in_seconds, max_results=250):
+    """
+    Get linearly interpolated values of <property_id> in <asset_id> on a fixed time grid
+    Args:
+        sw_client: IoT SiteWise client
+        asset_id: asset id
+        property_id: property id
+        start_time_seconds: start of the window (epoch seconds)
+        end_time_seconds: end of the window (epoch seconds)
+        interval_in_seconds: spacing of the time grid
+        max_results: max number of values per page
+    Returns:
+        dict mapping epoch seconds to interpolated value
+    """
+    params = {
+        'assetId': asset_id,
+        'propertyId': property_id,
+        'startTimeInSeconds': start_time_seconds,
+        'endTimeInSeconds': end_time_seconds,
+        'quality': 'GOOD',
+        'intervalInSeconds': interval_in_seconds,
+        'type': 'LINEAR_INTERPOLATION',
+        'maxResults': max_results
+    }
+    values = {}
+    while True:
+        response = sw_client.get_interpolated_asset_property_values(**params)
+        for item in response['interpolatedAssetPropertyValues']:
+            variant = item['value']
+            if 'doubleValue' in variant:
+                value = float(variant['doubleValue'])
+            elif 'integerValue' in variant:
+                value = float(variant['integerValue'])
+            elif 'booleanValue' in variant:
+                value = float(variant['booleanValue'])
+            else:
+                continue  # non-numeric values cannot be correlated
+            values[item['timestamp']['timeInSeconds']] = value
+        if 'nextToken' not in response:
+            return values
+        params['nextToken'] = response['nextToken']
+
+
+def _align_series(series, start_time_seconds, end_time_seconds, interval_in_seconds):
+    """
+    Place several interpolated series on a common, evenly spaced time grid
+    Args:
+        series: list of dicts mapping epoch seconds to value, one per property
+        start_time_seconds: first time on the grid (epoch seconds)
+        end_time_seconds: last time on the grid (epoch seconds)
+        interval_in_seconds: spacing of the time grid
+    Returns:
+        tuple of (timestamps, matrix) where matrix has one row per grid time and one
+        column per property, with NaN where a property has no value
+    """
+    timestamps = np.arange(start_time_seconds, end_time_seconds + 1, interval_in_seconds)
+    matrix = np.full((len(timestamps), len(series)), np.nan)
+    for column, values in enumerate(series):
+        times = np.fromiter(values.keys(), dtype=np.int64, count=len(values))
+        offsets = times - start_time_seconds
+        rows = offsets // interval_in_seconds
+        on_grid = (offsets % interval_in_seconds == 0) & (rows >= 0) & (rows < len(timestamps))
+        matrix[rows[on_grid], column] = np.fromiter(values.values(), dtype=float, count=len(values))[on_grid]
+    return timestamps, matrix
+
+
+def _lagged_correlations(matrix, max_lag, min_overlap):
+    """
+    Pearson correlation of every pair of columns for every lag in [-max_lag, max_lag]
+    Each correlation is computed on the overlapping rows where both values are present,
+    normalised by the mean and standard deviation of those rows only.
+    Args:
+        matrix: 2D array with one column per property on an evenly spaced time grid, NaN for gaps
+        max_lag: max number of grid steps to shift
+        min_overlap: min number of paired values needed for a correlation
+    Returns:
+        tuple of (lags, correlations) where correlations has shape (n_lags, n_columns, n_columns)
+        and correlations[k, i, j] pairs column i at time t with column j at time t + lags[k].
+        Correlations without enough paired values or with a constant slice are NaN.
+    """
+    n_rows, n_cols = matrix.shape
+    lags = np.arange(-max_lag, max_lag + 1)
+    correlations = np.full((len(lags), n_cols, n_cols), np.nan)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # standardise each column so the cancellation cutoff below does not depend on units
+        std = np.nanstd(matrix, axis=0)
+        centred = (matrix - np.nanmean(matrix, axis=0)) / np.where(std > 0, std, 1.0)
+    for k, lag in enumerate(lags):
+        overlap = n_rows - abs(lag)
+        if overlap < min_overlap:
+            continue
+        a, b = (centred[:overlap], centred[lag:]) if lag >= 0 else (centred[-lag:], centred[:overlap])
+        mask_a, mask_b = np.isfinite(a).astype(float), np.isfinite(b).astype(float)
+        a, b = np.nan_to_num(a), np.nan_to_num(b)
+        # [i, j] sums run over the rows where both column i of a and column j of b are present
+        count = mask_a.T @ mask_b
+        sum_a, sum_b = a.T @ mask_b, mask_a.T @ b
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cov = a.T @ b - sum_a * sum_b / count
+            var_a = (a ** 2).T @ mask_b - sum_a ** 2 / count
+            var_b = mask_a.T @ b ** 2 - sum_b ** 2 / count
+            denominator = np.sqrt(var_a * var_b)
+            r = np.where((count >= min_overlap) & (denominator > 1e-12 * count), cov / denominator, np.nan)
+        correlations[k] = np.clip(r, -1.0, 1.0)
+    return lags, correlations
+
+
+def _best_lags(lags, correlations):
+    """
+    Pick, for every pair of columns, the lag with the strongest correlation
+    Args:
+        lags: array of lags, as returned by _lagged_correlations
+        correlations: array of correlations, as returned by _lagged_correlations
+    Returns:
+        tuple of (lag, correlation) arrays of shape (n_columns, n_columns); the correlation
+        is NaN when no lag produced a finite value, in which case the lag is meaningless
+    """
+    best = np.argmax(np.nan_to_num(np.abs(correlations), nan=-1.0), axis=0)
+    best_corr = np.take_along_axis(correlations, best[np.newaxis], axis=0)[0]
+    return lags[best], best_corr
+
+
+def _round_or_none(value, digits=3):
+    """
+    Round a number for the response body, mapping NaN and infinity to None
+    Args:
+        value: number to round
+        digits: number of decimal digits
+    Returns:
+        rounded float, or None if value is not finite
+    """
+    return None if not np.isfinite(value) else round(float(value), digits)
+
+
+def get_aligned_values(sw_client, asset_name, property_names, interval_in_seconds=60, window_hours=1, max_lag=10):
+    """
+    Get several properties of an asset on a common time grid, with pairwise correlations and lags.
+    Args:
+        sw_client: IoT SiteWise client
+        asset_name: asset name
+        property_names: list of property names
+        interval_in_seconds: spacing of the common time grid
+        window_hours: length of the time window, ending now
+        max_lag: max number of grid steps to search for a lag between two properties
+    Returns:
+        asset id, grid description, per-property summary and pairwise correlation table
+    Raises:
+        ValueError: If asset or property does not exist, or no aligned data is available.
+    """
+    try:
+        asset_id = _get_asset_id(sw_client, asset_name)
+    except ValueError as e:
+        logger.error(f"Asset '{asset_name}' not found: {e}")
+        raise ValueError(f"Asset '{asset_name}' not found.") from e
+
+    end_time_seconds = int(datetime.now(timezone.utc).timestamp())
+    end_time_seconds -= end_time_seconds % interval_in_seconds
+    start_time_seconds = end_time_seconds - int(window_hours * 3600)
+
+    def _get_property_series(property_name):
+        try:
+            property_id = _get_property_id(sw_client, asset_id, property_name)
+        except ValueError as e:
+            logger.error(f"Property '{property_name}' not found for asset '{
+                         asset_name}': {e}")
+            raise ValueError(f"Property '{property_name}' not found for asset '{
+                             asset_name}'") from e
+        try:
+            _, unit = _get_property_uom(sw_client, asset_id, property_id)
+            values = _get_interpolated_values(
+                sw_client, asset_id, property_id, start_time_seconds, end_time_seconds, interval_in_seconds)
+        except Exception as e:
+            logger.error(f"Error retrieving interpolated values for property '{
+                         property_name}' on asset '{asset_name}': {e}")
+            raise ValueError(f"Error retrieving interpolated values for property '{
+                             property_name}' on asset '{asset_name}'") from e
+        if not values:
+            raise ValueError(f"No numeric values found for property '{
+                             property_name}' on asset '{asset_name}'")
+        return property_id, unit, values
+
+    with ThreadPoolExecutor(max_workers=len(property_names)) as executor:
+        property_ids, units, series = zip(*executor.map(_get_property_series, property_names))
+
+    timestamps, matrix = _align_series(series, start_time_seconds, end_time_seconds, interval_in_seconds)
+    min_overlap = max(10, len(timestamps) // 2)
+    lags, correlations = _lagged_correlations(matrix, max_lag, min_overlap)
+    best_lags, best_correlations = _best_lags(lags, correlations)
+    zero_lag = correlations[max_lag]
+
+    properties = [{
+        "name": property_name,
+        "propertyId": property_id,
+        "units": unit,
+        "samples": int(np.isfinite(column).sum()),
+        "mean": _round_or_none(np.nanmean(column)),
+        "minValue": _round_or_none(np.nanmin(column)),
+        "maxValue": _round_or_none(np.nanmax(column))
+    } for property_name, property_id, unit, column in zip(property_names, property_ids, units, matrix.T)]
+
+    rows, cols = np.triu_indices(len(property_names), k=1)
+    pairs = [{
+        "propertyA": property_names[i],
+        "propertyB": property_names[j],
+        "correlation": _round_or_none(zero_lag[i, j]),
+        "lagSeconds": int(best_lags[i, j]) * interval_in_seconds if np.isfinite(best_correlations[i, j]) else None,
+        "lagCorrelation": _round_or_none(best_correlations[i, j])
+    } for i, j in zip(rows, cols)]
+
+    return {
+        "assetId": asset_id,
+        "startTimestamp": datetime.fromtimestamp(int(timestamps[0]), timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
+        "endTimestamp": datetime.fromtimestamp(int(timestamps[-1]), timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
+        "intervalInSeconds": interval_in_seconds,
+        "samples": len(timestamps),
+        "properties": properties,
+        "correlations": pairs
+    }
+
+
 def list_asset_models(sw_client):
     """
     List all asset models in the AWS SiteWise account.
@@ -518,6 +753,27 @@ def lambda_handler(event, context):
             except ValueError as e:
                 return format_response(action_group, api_path, http_method, 404, {'error': str(e)}, session_attributes=session_attributes, prompt_session_attributes=prompt_session_attributes)
 
+        elif api_path == "/measurements/{AssetName}/aligned":
+            asset_name = _get_named_parameter(event, "AssetName")
+            property_names = [name.strip() for name in _get_named_parameter(event, "PropertyNames").split(',') if name.strip()]
+            try:
+                interval_in_seconds = int(_get_optional_parameter(event, "IntervalInSeconds", 60))
+                window_hours = float(_get_optional_parameter(event, "WindowHours", 1))
+            except ValueError:
+                return format_response(action_group, api_path, http_method, 400, {'error': "IntervalInSeconds and WindowHours must be numbers"},
+                                       session_attributes=session_attributes, prompt_session_attributes=prompt_session_attributes)
+            if not 2 <= len(property_names) <= 10:
+                return format_response(action_group, api_path, http_method, 400, {'error': "Between two and ten property names are required for alignment"},
+                                       session_attributes=session_attributes, prompt_session_attributes=prompt_session_attributes)
+            if not 1 <= interval_in_seconds <= 86400 or not 0 < window_hours * 3600 / interval_in_seconds <= 1000:
+                return format_response(action_group, api_path, http_method, 400, {'error': "IntervalInSeconds must be between 1 and 86400 and the window must hold at most 1000 intervals"},
+                                       session_attributes=session_attributes, prompt_session_attributes=prompt_session_attributes)
+            try:
+                body = get_aligned_values(sw_client, asset_name, property_names, interval_in_seconds, window_hours)
+                return format_response(action_group, api_path, http_method, 200, body, session_attributes=session_attributes, prompt_session_attributes=prompt_session_attributes)
+            except ValueError as e:
+                return format_response(action_group, api_path, http_method, 404, {'error': str(e)}, session_attributes=session_attributes, prompt_session_attributes=prompt_session_attributes)
+
         elif api_path == "/assets/all":
             body = list_all_assets(sw_client)
             return format_response(action_group, api_path, http_method, 200, body, session_attributes=session_attributes, prompt_session_attributes=prompt_session_attributes)
@@ -0,0 +1,206 @@
+import json
+import os
+import re
+import sys
+
+import numpy as np
+import pytest
+
+os.environ.setdefault('AWS_REGION', 'us-east-1')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lambda'))
+
+import lambda_function  # noqa: E402
+
+
+class StubSiteWiseClient:
+    """In-memory stand-in for the IoT SiteWise client used by the aligned measurements path."""
+
+    def __init__(self, series, asset_name='Turbine 3', page_size=25):
+        self.series = series
+        self.asset_name = asset_name
+        self.page_size = page_size
+        self.interpolated_calls = []
+
+    @staticmethod
+    def _result(columns, rows):
+        return {'columns': [{'name': name} for name in columns],
+                'rows': [{'data': [{'stringValue': value} for value in row]} for row in rows]}
+
+    def execute_query(self, queryStatement, maxResults):
+        if 'FROM asset_property' in queryStatement:
+            name = re.search(r"property_name = '([^']*)'", queryStatement).group(1)
+            rows = [['a1', 'p-' + name, name]] if name in self.series else []
+            return self._result(['asset_id', 'property_id', 'property_name'], rows)
+        name = re.search(r"asset_name = '([^']*)'", queryStatement).group(1)
+        rows = [['a1', name]] if name == self.asset_name else []
+        return self._result(['asset_id', 'asset_name'], rows)
+
+    def describe_asset_property(self, assetId, propertyId):
+        return {'assetProperty': {'name': propertyId[2:], 'unit': 'u-' + propertyId[2:]}}
+
+    def get_interpolated_asset_property_values(self, **params):
+        self.interpolated_calls.append(params)
+        function = self.series[params['propertyId'][2:]]
+        grid = range(params['startTimeInSeconds'], params['endTimeInSeconds'] + 1, params['intervalInSeconds'])
+        items = [{'timestamp': {'timeInSeconds': t, 'offsetInNanos': 0},
+                  'value': {'doubleValue': function((t - params['startTimeInSeconds']) // params['intervalInSeconds'])}}
+                 for t in grid]
+        start = int(params.get('nextToken', 0))
+        response = {'interpolatedAssetPropertyValues': items[start:start + self.page_size]}
+        if start + self.page_size < len(items):
+            response['nextToken'] = str(start + self.page_size)
+        return response
+
+
+SERIES = {
+    'RPM': lambda k: float(np.sin(k / 3.0)),
+    'Vibration': lambda k: 50.0 + 10.0 * float(np.sin((k - 2) / 3.0)),
+}
+
+
+def _event(**parameters):
+    return {'apiPath': '/measurements/{AssetName}/aligned', 'actionGroup': 'sitewise', 'httpMethod': 'GET',
+            'parameters': [{'name': name, 'value': value} for name, value in parameters.items()]}
+
+
+def _call_handler(monkeypatch, **parameters):
+    monkeypatch.setattr(lambda_function, 'sw_client', StubSiteWiseClient(SERIES))
+    response = lambda_function.lambda_handler(_event(**parameters), None)['response']
+    return response['httpStatusCode'], json.loads(response['responseBody']['application/json']['body'])
+
+
+def _best(matrix, max_lag=10, min_overlap=10):
+    lags, correlations = lambda_function._lagged_correlations(matrix, max_lag, min_overlap)
+    return correlations, lambda_function._best_lags(lags, correlations)
+
+
+def test_align_series_keeps_gaps_on_even_grid():
+    series = [{0: 1.0, 60: 2.0, 180: 4.0}, {0: 5.0, 60: 6.0, 120: 7.0, 180: 8.0}]
+    timestamps, matrix = lambda_function._align_series(series, 0, 180, 60)
+    assert timestamps.tolist() == [0, 60, 120, 180]
+    assert np.isnan(matrix[2, 0])
+    assert matrix[:, 1].tolist() == [5.0, 6.0, 7.0, 8.0]
+
+
+def test_known_shift_is_found():
+    t = np.arange(60)
+    x = np.sin(t / 3.0)
+    matrix = np.column_stack([x, np.roll(x, 4)])
+    correlations, (lag, corr) = _best(matrix)
+    assert lag[0, 1] == 4
+    assert corr[0, 1] == pytest.approx(1.0, abs=1e-6)
+    assert np.nanmax(np.abs(correlations)) <= 1.0
+
+
+def test_known_shift_is_found_at_small_scale():
+    t = np.arange(60)
+    x = 1e-9 * np.sin(t / 3.0)
+    _, (lag, corr) = _best(np.column_stack([x, np.roll(x, 4)]))
+    assert lag[0, 1] == 4
+    assert corr[0, 1] == pytest.approx(1.0, abs=1e-6)
+
+
+def test_correlations_stay_within_bounds_on_short_random_series():
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        correlations, _ = _best(rng.normal(size=(12, 3)), max_lag=10, min_overlap=6)
+        assert np.nanmax(np.abs(correlations)) <= 1.0
+
+
+def test_constant_column_has_no_lag():
+    t = np.arange(40)
+    matrix = np.column_stack([np.sin(t / 3.0), np.full(40, 2.5)])
+    _, (_, corr) = _best(matrix)
+    assert np.isnan(corr[0, 1])
+
+
+def test_gap_does_not_change_lag():
+    t = np.arange(80)
+    x = np.sin(t / 4.0) + 0.1 * np.cos(t / 1.7)
+    matrix = np.column_stack([x, np.roll(x, 3)])
+    matrix[30:36, :] = np.nan
+    _, (lag, corr) = _best(matrix)
+    assert lag[0, 1] == 3
+    assert corr[0, 1] == pytest.approx(1.0, abs=1e-6)
+
+
+def test_round_or_none():
+    assert lambda_function._round_or_none(np.nan) is None
+    assert lambda_function._round_or_none(1.23456) == 1.235
+
+
+def test_interpolated_values_follow_pages_and_convert_types():
+    pages = [
+        {'interpolatedAssetPropertyValues': [
+            {'timestamp': {'timeInSeconds': 0}, 'value': {'doubleValue': 1.5}},
+            {'timestamp': {'timeInSeconds': 60}, 'value': {'integerValue': 2}}],
+         'nextToken': 'next'},
+        {'interpolatedAssetPropertyValues': [
+            {'timestamp': {'timeInSeconds': 120}, 'value': {'booleanValue': True}},
+            {'timestamp': {'timeInSeconds': 180}, 'value': {'stringValue': 'RUNNING'}}]},
+    ]
+    calls = []
+
+    class Client:
+        def get_interpolated_asset_property_values(self, **params):
+            calls.append(params)
+            return pages[len(calls) - 1]
+
+    values = lambda_function._get_interpolated_values(Client(), 'a1', 'p1', 0, 180, 60)
+    assert values == {0: 1.5, 60: 2.0, 120: 1.0}
+    assert 'nextToken' not in calls[0]
+    assert calls[1]['nextToken'] == 'next'
+    assert calls[0]['type'] == 'LINEAR_INTERPOLATION'
+
+
+def test_aligned_values_keep_property_order_and_lag_sign():
+    client = StubSiteWiseClient(SERIES)
+    body = lambda_function.get_aligned_values(client, 'Turbine 3', ['Vibration', 'RPM'])
+    assert body['assetId'] == 'a1'
+    assert body['samples'] == 61
+    assert len(client.interpolated_calls) == 2 * 3  # 61 points in pages of 25
+    vibration, rpm = body['properties']
+    assert (vibration['name'], vibration['propertyId'], vibration['units']) == ('Vibration', 'p-Vibration', 'u-Vibration')
+    assert vibration['samples'] == 61
+    assert 49.0 < vibration['mean'] < 51.0
+    assert vibration['minValue'] >= 40.0 and vibration['maxValue'] <= 60.0
+    assert rpm['name'] == 'RPM' and -1.0 <= rpm['minValue'] < rpm['maxValue'] <= 1.0
+    [pair] = body['correlations']
+    assert (pair['propertyA'], pair['propertyB']) == ('Vibration', 'RPM')
+    # Vibration trails RPM by two steps, so RPM leads Vibration: negative lag
+    assert pair['lagSeconds'] == -120
+    assert pair['lagCorrelation'] == pytest.approx(1.0, abs=1e-3)
+
+
+def test_aligned_values_unknown_property_raises_value_error():
+    with pytest.raises(ValueError, match="Property 'Torque' not found for asset 'Turbine 3'"):
+        lambda_function.get_aligned_values(StubSiteWiseClient(SERIES), 'Turbine 3', ['RPM', 'Torque'])
+
+
+def test_handler_returns_aligned_table(monkeypatch):
+    status, body = _call_handler(monkeypatch, AssetName='Turbine 3', PropertyNames='RPM, Vibration')
+    assert status == 200
+    assert body['correlations'][0]['lagSeconds'] == 120
+
+
+@pytest.mark.parametrize('parameters', [
+    {'PropertyNames': 'RPM'},
+    {'PropertyNames': ','.join(f'P{i}' for i in range(11))},
+    {'PropertyNames': 'RPM,Vibration', 'IntervalInSeconds': 'fast'},
+    {'PropertyNames': 'RPM,Vibration', 'IntervalInSeconds': '0'},
+    {'PropertyNames': 'RPM,Vibration', 'IntervalInSeconds': '1', 'WindowHours': '1'},
+])
+def test_handler_rejects_invalid_requests(monkeypatch, parameters):
+    status, body = _call_handler(monkeypatch, AssetName='Turbine 3', **parameters)
+    assert status == 400
+    assert 'error' in body
+
+
+@pytest.mark.parametrize('asset_name, property_names, message', [
+    ('Turbine 9', 'RPM,Vibration', "Asset 'Turbine 9' not found."),
+    ('Turbine 3', 'RPM,Torque', "Property 'Torque' not found for asset 'Turbine 3'"),
+])
+def test_handler_maps_missing_asset_or_property_to_404(monkeypatch, asset_name, property_names, message):
+    status, body = _call_handler(monkeypatch, AssetName=asset_name, PropertyNames=property_names)
+    assert status == 404
+    assert body['error'] == message